@@ -0,0 +1,140 @@
+"""
+Archive of raw pages fetched from basketball-reference.com
+
+Every page is stored once, compressed, in an append-only data file. A
+separate index file maps each URL to the offset and length of its page in the
+data file, so any page can be read back without unpacking the others. Both
+files are only ever appended to, under a file lock, so several processes (or
+hosts sharing a filesystem) can use the same archive at once.
+"""
+
+import fcntl
+import os
+import zlib
+
+import requests
+
+
+DATA_FILE = 'pages.dat'
+INDEX_FILE = 'pages.idx'
+
+
+class PageArchive:
+    def __init__(self, path):
+        """
+        :param str path: directory holding the archive, created if missing
+        """
+
+        os.makedirs(path, exist_ok=True)
+        self.data_file = os.path.join(path, DATA_FILE)
+        self.index_file = os.path.join(path, INDEX_FILE)
+
+        # Create both files, so they can always be opened for reading
+        for filename in [self.data_file, self.index_file]:
+            open(filename, 'ab').close()
+
+        self.index = {}
+        self._index_pos = 0
+        self._data = open(self.data_file, 'rb')
+        self._load_index()
+
+    def _load_index(self):
+        """Read the index entries appended since the last call."""
+
+        with open(self.index_file, 'rb') as f:
+            f.seek(self._index_pos)
+            for line in f:
+                # A line without a newline is still being written
+                if not line.endswith(b'\n'):
+                    break
+                self._index_pos += len(line)
+                (offset, length, url) = line.decode('utf-8').rstrip('\n').split('\t')
+                self.index[url] = (int(offset), int(length))
+
+    def __contains__(self, url):
+        if url not in self.index:
+            self._load_index()  # Maybe archived by another process since
+        return url in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def urls(self):
+        """
+        :return list: the URLs of all archived pages, in the order archived
+        """
+
+        self._load_index()
+        return list(self.index)
+
+    def get(self, url):
+        """
+        :param str url: the URL the page was fetched from
+
+        :return str: the page
+        """
+
+        if url not in self:
+            raise KeyError(url)
+        (offset, length) = self.index[url]
+        self._data.seek(offset)
+        return zlib.decompress(self._data.read(length)).decode('utf-8')
+
+    def put(self, url, page):
+        """Archive a page, unless it is already archived.
+
+        :param str url: the URL the page was fetched from
+        :param str page: the page
+        """
+
+        blob = zlib.compress(page.encode('utf-8'), 9)
+
+        with open(self.data_file, 'ab') as data:
+            fcntl.flock(data, fcntl.LOCK_EX)
+            try:
+                self._load_index()
+                if url in self.index:
+                    return
+
+                data.seek(0, os.SEEK_END)
+                offset = data.tell()
+                data.write(blob)
+                data.flush()
+                os.fsync(data.fileno())
+
+                # Only index the page once it is fully written
+                with open(self.index_file, 'ab') as index:
+                    index.write(f'{offset}\t{len(blob)}\t{url}\n'.encode('utf-8'))
+            finally:
+                fcntl.flock(data, fcntl.LOCK_UN)
+
+        self._load_index()
+
+    def close(self):
+        self._data.close()
+
+
+def get_page(url, archive=None, store=True):
+    """Get a page, from the archive if it is there, or else from the web.
+
+    Pages fetched from the web are added to the archive, if one is given and
+    store is set; otherwise they are always fetched again. Error pages, e.g.
+    '429 Too Many Requests', raise an HTTPError and are never archived.
+
+    :param str url:
+    :param PageArchive archive:
+    :param bool store: whether to use the archive for this page, unset for
+                       pages that may still change
+
+    :return str: the page
+    """
+
+    if archive is not None and store and url in archive:
+        return archive.get(url)
+
+    response = requests.get(url)
+    response.raise_for_status()
+    page = response.text
+    if archive is not None and store:
+        archive.put(url, page)
+    return page
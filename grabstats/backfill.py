@@ -0,0 +1,343 @@
+"""
+Sharded backfills coordinated through a local work queue
+
+A coordinator turns a date range into one task per game in a SQLite queue.
+Any number of workers, on one host or on several hosts sharing a filesystem,
+claim tasks with a lease, grab the box scores and write them to their own
+partition files. Tasks whose lease expires, e.g. because the worker died, and
+tasks that failed are handed out again until they run out of attempts. A
+final merge combines the partitions into the usual CSV files.
+
+Note that SQLite relies on file locks, so when the queue is shared across
+hosts the filesystem has to support them (NFS with a lock daemon does).
+"""
+
+import glob
+import os
+import socket
+import sqlite3
+import time
+
+import arrow
+import pandas as pd
+import requests
+
+from grabstats.archive import PageArchive
+from grabstats.box_score import box_scores_get_game
+from grabstats.schedule import get_schedule
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    def __init__(self, path, lease_time=300, max_attempts=5, backoff=30):
+        """
+        :param str path: the SQLite file holding the queue, created if missing
+        :param int lease_time: seconds a worker has to finish a task before it
+                               is handed out again
+        :param int max_attempts: times a task is tried before giving up on it
+        :param int backoff: seconds to wait before retrying a failed task,
+                            doubled with every attempt
+        """
+
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        # Transactions are managed explicitly, see _transaction
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                date TEXT NOT NULL,
+                road_team_abbr TEXT NOT NULL,
+                home_team_abbr TEXT NOT NULL,
+                box_score_url TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                available_at REAL,
+                error TEXT
+            )
+        """)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can
+        # never read the same pending task and both claim it
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def put(self, schedule):
+        """Add one task per game in the schedule. Games already in the queue
+        are left untouched, so the same range can be enqueued again safely.
+
+        :param pd.DataFrame schedule: contains game info for the schedule of games
+
+        :return int: the number of tasks added
+        """
+
+        rows = [
+            (row['DATE'], row['ROAD_TEAM_ABBR'], row['HOME_TEAM_ABBR'],
+             row['BOX_SCORE_URL'])
+            for idx, row in schedule.iterrows()
+        ]
+
+        self._transaction()
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany("""
+                INSERT OR IGNORE INTO tasks
+                    (date, road_team_abbr, home_team_abbr, box_score_url)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            added = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker):
+        """Lease the next available task to a worker.
+
+        :param str worker: identifies the worker holding the lease
+
+        :return dict: the task, or None if there is nothing to hand out now
+        """
+
+        now = time.time()
+        self._transaction()
+        try:
+            # Expired leases that used up their attempts are given up on
+            self.conn.execute("""
+                UPDATE tasks SET status = ?, error = 'lease expired'
+                WHERE status = ? AND lease_expires < ? AND attempts >= ?
+            """, (FAILED, LEASED, now, self.max_attempts))
+
+            row = self.conn.execute("""
+                SELECT id, date, road_team_abbr, home_team_abbr, box_score_url
+                FROM tasks
+                WHERE (status = ? AND (available_at IS NULL OR available_at <= ?))
+                   OR (status = ? AND lease_expires < ?)
+                ORDER BY id
+                LIMIT 1
+            """, (PENDING, now, LEASED, now)).fetchone()
+
+            if row is not None:
+                self.conn.execute("""
+                    UPDATE tasks
+                    SET status = ?, attempts = attempts + 1, worker = ?,
+                        lease_expires = ?
+                    WHERE id = ?
+                """, (LEASED, worker, now + self.lease_time, row[0]))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            return None
+        keys = ['id', 'date', 'road_team_abbr', 'home_team_abbr', 'box_score_url']
+        return dict(zip(keys, row))
+
+    def complete(self, task_id, worker):
+        """Mark a task as done, as long as the worker still holds its lease.
+
+        :return bool: whether the worker still held the lease
+        """
+
+        cursor = self.conn.execute("""
+            UPDATE tasks SET status = ?, error = NULL
+            WHERE id = ? AND worker = ? AND status = ?
+        """, (DONE, task_id, worker, LEASED))
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error):
+        """Release a task after an error so it can be retried, or give up on it
+        if it ran out of attempts. The task is held back for backoff * 2 **
+        attempts seconds first, so e.g. a rate limit has time to wear off.
+        """
+
+        self.conn.execute("""
+            UPDATE tasks
+            SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                error = ?, lease_expires = NULL,
+                available_at = ? + ? * (1 << attempts)
+            WHERE id = ? AND worker = ? AND status = ?
+        """, (self.max_attempts, FAILED, PENDING, str(error),
+              time.time(), self.backoff, task_id, worker, LEASED))
+
+    def counts(self):
+        """
+        :return dict: the number of tasks for each status
+        """
+
+        rows = self.conn.execute(
+            'SELECT status, COUNT(*) FROM tasks GROUP BY status'
+        ).fetchall()
+        counts = {status: 0 for status in [PENDING, LEASED, DONE, FAILED]}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+def get_schedule_range(start, end, archive=None):
+    """
+    :param datetime start: first day of the range
+    :param datetime end: last day of the range, included
+    :param PageArchive archive: where to look up and store the schedule pages
+
+    :return pd.DataFrame schedule: contains game info for games played in the
+                                   date range
+    """
+
+    start = arrow.get(start).floor('day')
+    end = arrow.get(end).floor('day')
+
+    schedules = []
+    for month in arrow.Arrow.range('month', start.floor('month'), end):
+        try:
+            schedules.append(get_schedule(month.format('YYYY'),
+                                          month.format('MM'), archive=archive))
+        except requests.HTTPError as e:
+            # Months without games, e.g. in the off-season, have no page
+            if e.response is not None and e.response.status_code == 404:
+                continue
+            raise
+    if not schedules:
+        return pd.DataFrame(columns=['DATE', 'ROAD_TEAM_ABBR',
+                                     'HOME_TEAM_ABBR', 'BOX_SCORE_URL'])
+    schedule = pd.concat(schedules, ignore_index=True)
+
+    first = start.format('YYYY-MM-DD')
+    last = end.format('YYYY-MM-DD')
+    return schedule.query('@first <= DATE <= @last').reset_index(drop=True)
+
+
+def enqueue(queue_file, start, end, archive_dir=None):
+    """Coordinator: add a task for every game played from start to end.
+
+    :param str archive_dir: directory of the page archive, if any
+
+    :return int: the number of tasks added
+    """
+
+    archive = PageArchive(archive_dir) if archive_dir else None
+    schedule = get_schedule_range(start, end, archive)
+    queue = WorkQueue(queue_file)
+    try:
+        return queue.put(schedule)
+    finally:
+        queue.close()
+
+
+def _game_id(box_score_url):
+    """e.g. '201905030BOS' for '.../boxscores/201905030BOS.html'"""
+    return os.path.splitext(os.path.basename(box_score_url))[0]
+
+
+def _write_partition(box_score, out_dir, kind, game_id):
+    """Write a partition atomically, so a retried task simply replaces it and
+    a merge never sees half a file.
+    """
+
+    part_dir = os.path.join(out_dir, kind)
+    os.makedirs(part_dir, exist_ok=True)
+    outfile = os.path.join(part_dir, f'{game_id}.csv')
+    tmpfile = f'{outfile}.{os.getpid()}.tmp'
+    box_score.to_csv(tmpfile, index=False)
+    os.replace(tmpfile, outfile)
+
+
+def work(queue_file, out_dir, lease_time=300, max_attempts=5, delay=0,
+         archive_dir=None, backoff=30, poll_interval=10):
+    """Worker: claim tasks until the queue is drained.
+
+    :param str queue_file: the SQLite file holding the queue
+    :param str out_dir: directory for the partitioned outputs
+    :param str archive_dir: directory of the page archive, if any
+    :param int delay: seconds to wait between games, to stay under rate limits
+    :param int backoff: seconds to wait before retrying a failed game, doubled
+                        with every attempt
+    :param int poll_interval: seconds to wait for leases held by other workers
+                              to finish or expire, or for failed games to be
+                              retried
+
+    :return int: the number of games grabbed by this worker
+    """
+
+    worker = f'{socket.gethostname()}-{os.getpid()}'
+    queue = WorkQueue(queue_file, lease_time, max_attempts, backoff)
+    archive = PageArchive(archive_dir) if archive_dir else None
+    n_done = 0
+
+    try:
+        while True:
+            task = queue.claim(worker)
+            if task is None:
+                counts = queue.counts()
+                if counts[PENDING] == 0 and counts[LEASED] == 0:
+                    break  # Nothing to retry and no lease that could expire
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                basic, adv = box_scores_get_game(
+                    task['date'],
+                    task['road_team_abbr'],
+                    task['home_team_abbr'],
+                    task['box_score_url'],
+                    archive,
+                )
+                game_id = _game_id(task['box_score_url'])
+                _write_partition(basic, out_dir, 'basic', game_id)
+                _write_partition(adv, out_dir, 'adv', game_id)
+            except Exception as e:
+                queue.fail(task['id'], worker, e)
+                print(f'Failed {task["box_score_url"]}: {e}')
+            else:
+                if queue.complete(task['id'], worker):
+                    n_done += 1
+                    print(f'Grabbed {task["road_team_abbr"]} vs '
+                          f'{task["home_team_abbr"]} box score for {task["date"]}')
+            time.sleep(delay)
+    finally:
+        queue.close()
+
+    return n_done
+
+
+def _merge_partitions(partitions, outfile):
+    """Concatenate CSV partitions into one file, keeping the first header."""
+
+    with open(outfile, 'w') as out:
+        header_written = False
+        for partition in partitions:
+            with open(partition, 'r') as f:
+                header = f.readline()
+                if not header_written:
+                    out.write(header)
+                    header_written = True
+                for line in f:
+                    out.write(line)
+
+
+def merge(out_dir, basic_box_score_file, adv_box_score_file):
+    """Combine the partitions written by the workers, in game order.
+
+    :return int: the number of games merged
+    """
+
+    basic_partitions = sorted(glob.glob(os.path.join(out_dir, 'basic', '*.csv')))
+    adv_partitions = sorted(glob.glob(os.path.join(out_dir, 'adv', '*.csv')))
+
+    _merge_partitions(basic_partitions, basic_box_score_file)
+    _merge_partitions(adv_partitions, adv_box_score_file)
+
+    return len(basic_partitions)
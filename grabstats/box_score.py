@@ -4,14 +4,46 @@
 import os
 
 from bs4 import BeautifulSoup
+import numpy as np
 import pandas as pd
-import requests
+
+from grabstats.archive import get_page
+
+
+# Every column (data-stat) of the basic and advanced box score tables, some of
+# which are only tracked in more recent seasons
+BASIC_DATA_STATS = [
+    'player', 'mp',
+    'fg', 'fga', 'fg_pct',
+    'fg3', 'fg3a', 'fg3_pct',
+    'ft', 'fta', 'ft_pct',
+    'orb', 'drb', 'trb',
+    'ast', 'stl', 'blk',
+    'tov', 'pf',
+    'pts',
+    'game_score',
+    'plus_minus',
+]
+
+ADV_DATA_STATS = [
+    'player', 'mp',
+    'ts_pct', 'efg_pct',
+    'fg3a_per_fga_pct', 'fta_per_fga_pct',
+    'orb_pct', 'drb_pct', 'trb_pct',
+    'ast_pct', 'stl_pct', 'blk_pct',
+    'tov_pct', 'usg_pct',
+    'off_rtg', 'def_rtg',
+    'bpm',
+]
 
 
 def _get_data_stat(row, data_stat, is_header=False):
-    if is_header:
-        return row.find('th', {'data-stat': data_stat}).text
-    return row.find('td', {'data-stat': data_stat}).text
+    cell = row.find('th' if is_header else 'td', {'data-stat': data_stat})
+    # Stats a row does not have, e.g. ones not tracked in older seasons, are
+    # missing values rather than errors
+    if cell is None:
+        return np.nan
+    return cell.text
 
 
 def format_time(mp):
@@ -21,6 +53,8 @@ def format_time(mp):
 
     :return int: e.g. 24.5
     """
+    if pd.isna(mp):
+        return mp
     (m, s) = mp.split(':')
     digital = int(m) + int(s) / 60
     return round(digital, 1)
@@ -50,16 +84,22 @@ class BoxScore:
             box_score[data_stat] = [_get_data_stat(row, data_stat, is_header)
                                     for row in active_player_rows]
 
-        box_score['mp'] = box_score['mp'].apply(format_time)
+        if 'mp' in box_score:
+            box_score['mp'] = box_score['mp'].apply(format_time)
         return box_score
 
 
 class BasicBoxScore(BoxScore):
-    def __init__(self, soup):
+    def __init__(self, soup, data_stats=None):
+        """
+        :param BeautifulSoup soup: the box score page
+        :param list data_stats: the columns to get, instead of the default ones
+        """
+
         super().__init__(soup)
 
         self.box_score_type = 'basic'
-        self.data_stats = [
+        self.data_stats = data_stats or [
             'player', 'mp',
             'fg', 'fga', 'fg_pct',
 #             'fg3', 'fg3a', 'fg3_pct',
@@ -73,11 +113,16 @@ class BasicBoxScore(BoxScore):
 
 
 class AdvBoxScore(BoxScore):
-    def __init__(self, soup):
+    def __init__(self, soup, data_stats=None):
+        """
+        :param BeautifulSoup soup: the box score page
+        :param list data_stats: the columns to get, instead of the default ones
+        """
+
         super().__init__(soup)
 
         self.box_score_type = 'advanced'
-        self.data_stats = [
+        self.data_stats = data_stats or [
             'player', 'mp',
 #             'ts_pct', 'efg_pct',
 #             'fg3a_per_fga_pct', 'fta_per_fga_pct',
@@ -88,27 +133,127 @@ class AdvBoxScore(BoxScore):
         ]
 
 
-def box_scores_get_one(team_name, url):
+def box_scores_parse(soup, team_name, basic_stats=None, adv_stats=None):
+    """Get the basic and advanced box scores for one team from a parsed page.
+
+    :param BeautifulSoup soup: the box score page
+    :param str team_name: the capitalized abbreviated name, e.g. 'DEN'
+    :param list basic_stats: the basic columns to get, instead of the default ones
+    :param list adv_stats: the advanced columns to get, instead of the default ones
+    """
+
+    basic = BasicBoxScore(soup, basic_stats).get(team_name.lower())
+    adv = AdvBoxScore(soup, adv_stats).get(team_name.lower())
+
+    if 'usg_pct' in adv:
+        basic['usg_pct'] = adv['usg_pct']
+
+    return basic, adv
+
+
+def box_scores_get_one(team_name, url, archive=None):
     """Get the basic and advanced box scores for one team and one game.
 
     :param str team_name: the capitalized abbreviated name, e.g. 'DEN'
     :param str url: the URL to the box score page on basketball-reference.com
+    :param PageArchive archive: where to look up and store the page
     """
 
-    page = requests.get(url).text
+    page = get_page(url, archive)
     soup = BeautifulSoup(page, 'lxml')
 
-    basic = BasicBoxScore(soup).get(team_name.lower())
-    adv = AdvBoxScore(soup).get(team_name.lower())
+    return box_scores_parse(soup, team_name)
 
-    basic['usg_pct'] = adv['usg_pct']
+
+def box_scores_get_game(game_date, road_team_abbr, home_team_abbr, box_score_url,
+                        archive=None, basic_stats=None, adv_stats=None):
+    """Get the basic and advanced box scores for both teams of one game.
+
+    :param str game_date: e.g. '2019-05-03'
+    :param str road_team_abbr: the capitalized abbreviated name, e.g. 'MIL'
+    :param str home_team_abbr: the capitalized abbreviated name, e.g. 'BOS'
+    :param str box_score_url: the URL to the box score page
+    :param PageArchive archive: where to look up and store the page
+    :param list basic_stats: the basic columns to get, instead of the default ones
+    :param list adv_stats: the advanced columns to get, instead of the default ones
+
+    :return tuple: the basic and advanced box scores, road team rows first
+    """
+
+    page = get_page(box_score_url, archive)
+    return box_scores_parse_game(page, game_date, road_team_abbr,
+                                 home_team_abbr, basic_stats, adv_stats)
+
+
+def box_scores_parse_game(page, game_date, road_team_abbr, home_team_abbr,
+                          basic_stats=None, adv_stats=None):
+    """Get the basic and advanced box scores for both teams from a box score page.
+
+    :param str page: the box score page
+
+    See box_scores_get_game for the other parameters and the return value.
+    """
+
+    # Both teams are on the same page, so parse it only once
+    soup = BeautifulSoup(page, 'lxml')
+
+    road_basic, road_adv = box_scores_parse(soup, road_team_abbr,
+                                            basic_stats, adv_stats)
+    home_basic, home_adv = box_scores_parse(soup, home_team_abbr,
+                                            basic_stats, adv_stats)
+
+    # BASIC BOX SCORE
+    # Road team
+    road_basic['DATE'] = game_date
+    road_basic['OWN_TEAM'] = road_team_abbr
+    road_basic['OPP_TEAM'] = home_team_abbr
+    road_basic['VENUE'] = 'R'
+
+    # Home team
+    home_basic['DATE'] = game_date
+    home_basic['OWN_TEAM'] = home_team_abbr
+    home_basic['OPP_TEAM'] = road_team_abbr
+    home_basic['VENUE'] = 'H'
+
+    basic = pd.concat([road_basic, home_basic])
+
+#     reordered_cols = [
+#         'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
+#         'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', 'FT', 'FTA', 'FT%',
+#         'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS',
+#         '+/-', 'USG%', 'PACE'
+#     ]
+#     basic = basic[reordered_cols]
+
+    # ADVANCED BOX SCORE
+    # Road team
+    road_adv['DATE'] = game_date
+    road_adv['OWN_TEAM'] = road_team_abbr
+    road_adv['OPP_TEAM'] = home_team_abbr
+    road_adv['VENUE'] = 'R'
+
+    # Home team
+    home_adv['DATE'] = game_date
+    home_adv['OWN_TEAM'] = home_team_abbr
+    home_adv['OPP_TEAM'] = road_team_abbr
+    home_adv['VENUE'] = 'H'
+
+    adv = pd.concat([road_adv, home_adv])
+
+#     reordered_cols = [
+#         'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
+#         'TS%', 'eFG%', '3PAr', 'FTr', 'ORB%', 'DRB%', 'TRB%', 'AST%',
+#         'STL%', 'BLK%', 'TOV%', 'USG%', 'ORtg', 'DRtg'
+#     ]
+#     adv = adv[reordered_cols]
 
     return basic, adv
 
 
-def box_scores_get_many(schedule):
+def box_scores_get_many(schedule, archive=None):
     """
     :param pd.DataFrame schedule: contains game info for the schedule of games
+    :param PageArchive archive: where to look up and store the pages
 
     :return tuple: to be finished ...
     """
@@ -117,59 +262,14 @@ def box_scores_get_many(schedule):
     adv_box_scores = []
 
     for idx, row in schedule.iterrows():
-        game_date = row['DATE']
-        road_team_abbr = row['ROAD_TEAM_ABBR']
-        home_team_abbr = row['HOME_TEAM_ABBR']
-        box_score_url = row['BOX_SCORE_URL']
-
-        road_basic, road_adv = box_scores_get_one(road_team_abbr, box_score_url)
-        home_basic, home_adv = box_scores_get_one(home_team_abbr, box_score_url)
-
-        # BASIC BOX SCORE
-        # Road team
-        road_basic['DATE'] = game_date
-        road_basic['OWN_TEAM'] = road_team_abbr
-        road_basic['OPP_TEAM'] = home_team_abbr
-        road_basic['VENUE'] = 'R'
-
-        # Home team
-        home_basic['DATE'] = game_date
-        home_basic['OWN_TEAM'] = home_team_abbr
-        home_basic['OPP_TEAM'] = road_team_abbr
-        home_basic['VENUE'] = 'H'
-
-        basic = pd.concat([road_basic, home_basic])
-
-#         reordered_cols = [
-#             'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
-#             'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', 'FT', 'FTA', 'FT%',
-#             'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS',
-#             '+/-', 'USG%', 'PACE'
-#         ]
-#         basic = basic[reordered_cols]
+        basic, adv = box_scores_get_game(
+            row['DATE'],
+            row['ROAD_TEAM_ABBR'],
+            row['HOME_TEAM_ABBR'],
+            row['BOX_SCORE_URL'],
+            archive,
+        )
         basic_box_scores.append(basic)
-
-        # ADVANCED BOX SCORE
-        # Road team
-        road_adv['DATE'] = game_date
-        road_adv['OWN_TEAM'] = road_team_abbr
-        road_adv['OPP_TEAM'] = home_team_abbr
-        road_adv['VENUE'] = 'R'
-
-        # Home team
-        home_adv['DATE'] = game_date
-        home_adv['OWN_TEAM'] = home_team_abbr
-        home_adv['OPP_TEAM'] = road_team_abbr
-        home_adv['VENUE'] = 'H'
-
-        adv = pd.concat([road_adv, home_adv])
-
-#         reordered_cols = [
-#             'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
-#             'TS%', 'eFG%', '3PAr', 'FTr', 'ORB%', 'DRB%', 'TRB%', 'AST%',
-#             'STL%', 'BLK%', 'TOV%', 'USG%', 'ORtg', 'DRtg'
-#         ]
-#         adv = adv[reordered_cols]
         adv_box_scores.append(adv)
 
     return basic_box_scores, adv_box_scores
@@ -1,12 +1,42 @@
 #!/usr/bin/env python3
 
+import multiprocessing
+
 import click
 
+from grabstats import backfill
+from grabstats.archive import PageArchive
+from grabstats.importer import import_csv
+from grabstats.reextract import reextract as reextract_archive
 from grabstats.schedule import get_schedule
+from grabstats.box_score import ADV_DATA_STATS, BASIC_DATA_STATS
 from grabstats.box_score import box_scores_get_many, to_csv
+from grabstats.play_by_play import play_by_play_get_many
+from grabstats.play_by_play import to_csv as play_by_play_to_csv
+
+
+class DefaultGroup(click.Group):
+    """A group that runs its default command when not given a command name, so
+    that e.g. `grabstats 2018-11-15` still works as `grabstats grab 2018-11-15`.
+    """
+
+    default_command = 'grab'
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] != '--help':
+            args = [self.default_command] + args
+        return super().parse_args(ctx, args)
+
 
+@click.group(cls=DefaultGroup)
+def main():
+    """Scrape NBA stats from Basketball-Reference
 
-@click.command()
+    Without a command name, the arguments are passed to grab.
+    """
+
+
+@main.command()
 @click.option(
     '-b',
     '--basic',
@@ -23,6 +53,21 @@ from grabstats.box_score import box_scores_get_many, to_csv
     default='adv_box_score.csv',
     help='CSV file to write advanced box score',
 )
+@click.option(
+    '-p',
+    '--pbp',
+    'pbp_file',
+    type=click.Path(),
+    default=None,
+    help='CSV file to write play-by-play events',
+)
+@click.option(
+    '--archive',
+    'archive_dir',
+    type=click.Path(file_okay=False),
+    default=None,
+    help='Directory of an archive to look up and store fetched pages',
+)
 @click.option(
     '-dk',
     '--draftkings',
@@ -41,13 +86,16 @@ from grabstats.box_score import box_scores_get_many, to_csv
     'date',
     type=click.DateTime(formats=['%Y-%m-%d', '%Y-%m'])
 )
-def main(date, basic_box_score_file, adv_box_score_file, calc_dk, calc_fd):
+def grab(date, basic_box_score_file, adv_box_score_file, pbp_file,
+         archive_dir, calc_dk, calc_fd):
+    """Grab the box scores for a day or a month"""
     print(date)
     year = '2019'
     month = '05'
     day = '03'
-    schedule = get_schedule(year, month, day)
-    basic_box_scores, adv_box_scores = box_scores_get_many(schedule)
+    archive = PageArchive(archive_dir) if archive_dir else None
+    schedule = get_schedule(year, month, day, archive)
+    basic_box_scores, adv_box_scores = box_scores_get_many(schedule, archive)
 
     for box_score in basic_box_scores:
         to_csv(box_score, basic_box_score_file)
@@ -55,6 +103,248 @@ def main(date, basic_box_score_file, adv_box_score_file, calc_dk, calc_fd):
     for box_score in adv_box_scores:
         to_csv(box_score, adv_box_score_file)
 
+    if pbp_file:
+        play_by_play_to_csv(play_by_play_get_many(schedule), pbp_file)
+
+
+@main.command()
+@click.option(
+    '-q',
+    '--queue',
+    'queue_file',
+    type=click.Path(),
+    default='grabstats_queue.db',
+    help='SQLite file holding the work queue',
+)
+@click.option(
+    '--archive',
+    'archive_dir',
+    type=click.Path(file_okay=False),
+    default=None,
+    help='Directory of an archive to look up and store fetched pages',
+)
+@click.argument('start', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.argument('end', type=click.DateTime(formats=['%Y-%m-%d']))
+def enqueue(queue_file, archive_dir, start, end):
+    """Add a task for every game from START to END to the work queue"""
+    n_added = backfill.enqueue(queue_file, start, end, archive_dir)
+    print(f'Added {n_added} games to {queue_file}')
+
+
+@main.command()
+@click.option(
+    '-q',
+    '--queue',
+    'queue_file',
+    type=click.Path(exists=True),
+    default='grabstats_queue.db',
+    help='SQLite file holding the work queue',
+)
+@click.option(
+    '-o',
+    '--out',
+    'out_dir',
+    type=click.Path(file_okay=False),
+    default='partitions',
+    help='Directory to write the partitioned box scores',
+)
+@click.option(
+    '-n',
+    '--processes',
+    type=int,
+    default=1,
+    help='Number of worker processes to start on this host',
+)
+@click.option(
+    '--lease',
+    'lease_time',
+    type=int,
+    default=300,
+    help='Seconds before an unfinished task is handed out again',
+)
+@click.option(
+    '--max-attempts',
+    type=int,
+    default=5,
+    help='Times a game is tried before giving up on it',
+)
+@click.option(
+    '--delay',
+    type=float,
+    default=0,
+    help='Seconds to wait between games',
+)
+@click.option(
+    '--backoff',
+    type=float,
+    default=30,
+    help='Seconds to wait before retrying a failed game, doubled every attempt',
+)
+@click.option(
+    '--archive',
+    'archive_dir',
+    type=click.Path(file_okay=False),
+    default=None,
+    help='Directory of an archive to look up and store fetched pages',
+)
+def work(queue_file, out_dir, processes, lease_time, max_attempts, delay,
+         backoff, archive_dir):
+    """Grab the games in the work queue"""
+    args = (queue_file, out_dir, lease_time, max_attempts, delay, archive_dir,
+            backoff)
+    if processes == 1:
+        backfill.work(*args)
+    else:
+        workers = [multiprocessing.Process(target=backfill.work, args=args)
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    print('All done!')
+
+
+@main.command()
+@click.option(
+    '-q',
+    '--queue',
+    'queue_file',
+    type=click.Path(exists=True),
+    default='grabstats_queue.db',
+    help='SQLite file holding the work queue',
+)
+@click.option(
+    '-o',
+    '--out',
+    'out_dir',
+    type=click.Path(exists=True, file_okay=False),
+    default='partitions',
+    help='Directory with the partitioned box scores',
+)
+@click.option(
+    '-b',
+    '--basic',
+    'basic_box_score_file',
+    type=click.Path(),
+    default='basic_box_score.csv',
+    help='CSV file to write basic box score',
+)
+@click.option(
+    '-a',
+    '--adv',
+    'adv_box_score_file',
+    type=click.Path(),
+    default='adv_box_score.csv',
+    help='CSV file to write advanced box score',
+)
+def merge(queue_file, out_dir, basic_box_score_file, adv_box_score_file):
+    """Combine the partitioned box scores into CSV files"""
+    queue = backfill.WorkQueue(queue_file)
+    counts = queue.counts()
+    queue.close()
+    if counts[backfill.PENDING] or counts[backfill.LEASED]:
+        print(f'Warning: {counts[backfill.PENDING]} pending and '
+              f'{counts[backfill.LEASED]} leased games are not merged')
+    if counts[backfill.FAILED]:
+        print(f'Warning: {counts[backfill.FAILED]} games failed')
+
+    n_games = backfill.merge(out_dir, basic_box_score_file, adv_box_score_file)
+    print(f'Merged {n_games} games')
+
+
+def _split_stats(known_stats):
+    """Make a callback that splits a comma-separated list of stats, and checks
+    them, so a typo fails before a long run rather than giving empty columns.
+    """
+
+    def callback(ctx, param, value):
+        if not value:
+            return None
+        stats = value.split(',')
+        unknown = [stat for stat in stats if stat not in known_stats]
+        if unknown:
+            raise click.BadParameter(
+                f'unknown stats: {", ".join(unknown)} '
+                f'(known: {", ".join(known_stats)})'
+            )
+        return stats
+
+    return callback
+
+
+@main.command()
+@click.option(
+    '--archive',
+    'archive_dir',
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help='Directory of the archive to re-extract',
+)
+@click.option(
+    '-b',
+    '--basic',
+    'basic_box_score_file',
+    type=click.Path(),
+    default='basic_box_score.csv',
+    help='CSV file to write basic box score',
+)
+@click.option(
+    '-a',
+    '--adv',
+    'adv_box_score_file',
+    type=click.Path(),
+    default='adv_box_score.csv',
+    help='CSV file to write advanced box score',
+)
+@click.option(
+    '--basic-stats',
+    callback=_split_stats(BASIC_DATA_STATS),
+    help='Comma-separated basic columns (data-stat names), e.g. player,mp,fg3',
+)
+@click.option(
+    '--adv-stats',
+    callback=_split_stats(ADV_DATA_STATS),
+    help='Comma-separated advanced columns (data-stat names), e.g. player,mp,ts_pct',
+)
+@click.option(
+    '-n',
+    '--processes',
+    type=int,
+    default=None,
+    help='Number of parser processes, defaults to the number of CPUs',
+)
+def reextract(archive_dir, basic_box_score_file, adv_box_score_file,
+              basic_stats, adv_stats, processes):
+    """Parse the archived pages again into fresh CSV files"""
+    n_games = reextract_archive(archive_dir, basic_box_score_file,
+                                adv_box_score_file, basic_stats, adv_stats,
+                                processes)
+    print(f'Re-extracted {n_games} games')
+
+
+@main.command('import')
+@click.option(
+    '-o',
+    '--out',
+    'out_dir',
+    type=click.Path(file_okay=False),
+    default='box_scores',
+    help='Directory to write the basic and advanced datasets',
+)
+@click.option(
+    '-n',
+    '--processes',
+    type=int,
+    default=None,
+    help='Number of parser processes, defaults to the number of CPUs',
+)
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+def import_(out_dir, processes, paths):
+    """Import CSV box scores into columnar datasets"""
+    rows = import_csv(paths, out_dir, processes)
+    print(f'Imported {rows["basic"]} basic and {rows["adv"]} advanced rows '
+          f'into {out_dir}')
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
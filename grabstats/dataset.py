@@ -0,0 +1,333 @@
+"""
+Columnar on-disk store for the player-game table
+
+A dataset is a directory with one raw, fixed-width array file per column and a
+meta.json describing them. Numeric columns are stored as float64, the DATE
+column as datetime64[D], and string columns (player and team names, ...) as
+int32 codes into a dictionary of their values kept in meta.json.
+
+The column files are opened with memory mapping, so opening a dataset is
+nearly instant, processes reading the same dataset share the pages in memory,
+and reading a few columns, or a date range, only touches those bytes. Rows are
+kept sorted by DATE, so date ranges are found by binary search.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+META_FILE = 'meta.json'
+
+NUMERIC = 'numeric'
+CATEGORY = 'category'
+DATE = 'date'
+
+DTYPES = {
+    NUMERIC: np.dtype('<f8'),
+    CATEGORY: np.dtype('<i4'),
+    DATE: np.dtype('<M8[D]'),
+}
+
+
+def _infer_kind(name, values):
+    if name == 'DATE':
+        return DATE
+    if pd.api.types.is_numeric_dtype(values):
+        return NUMERIC
+    # Strings that are all numbers, e.g. read from CSV as str, are numeric
+    converted = pd.to_numeric(values, errors='coerce')
+    if converted.notna().sum() == values.notna().sum():
+        return NUMERIC
+    return CATEGORY
+
+
+def encode(df, schema):
+    """Convert rows to the arrays stored for each column. This is the costly
+    part of appending rows, and can be done in parallel.
+
+    :param pd.DataFrame df: the rows; columns missing from the schema are
+                            ignored, and missing columns are left empty
+    :param dict schema: maps column names to 'numeric', 'category' or 'date'
+
+    :return dict: maps column names to arrays, or for string columns to the
+                  codes into their values, and the values
+    """
+
+    columns = {}
+    for name, kind in schema.items():
+        if name in df:
+            values = df[name].reset_index(drop=True)
+        else:
+            values = pd.Series([None] * len(df), dtype=object)
+
+        if kind == NUMERIC:
+            values = pd.to_numeric(values, errors='coerce')
+            columns[name] = values.to_numpy(DTYPES[kind])
+        elif kind == DATE:
+            columns[name] = pd.to_datetime(values).to_numpy('datetime64[D]')
+        else:
+            (codes, uniques) = pd.factorize(values)
+            columns[name] = (codes.astype(DTYPES[kind]), list(uniques))
+    return columns
+
+
+class DatasetWriter:
+    def __init__(self, path, schema=None):
+        """
+        :param str path: directory of the dataset, replaced if it exists
+        :param dict schema: maps column names to 'numeric', 'category' or
+                            'date', inferred from the first chunk if not given
+        """
+
+        self.path = path
+        self.schema = schema
+        self.categories = {}
+        self.rows = 0
+        self._files = {}
+
+        os.makedirs(path, exist_ok=True)
+        for filename in os.listdir(path):
+            if filename == META_FILE or filename.endswith('.bin'):
+                os.remove(os.path.join(path, filename))
+
+    def _column_file(self, i):
+        return os.path.join(self.path, f'col{i}.bin')
+
+    def _start(self):
+        for i, (name, kind) in enumerate(self.schema.items()):
+            if kind == CATEGORY:
+                self.categories[name] = {}
+            self._files[name] = open(self._column_file(i), 'wb')
+
+    def append(self, df):
+        """Append rows at the end of every column file.
+
+        :param pd.DataFrame df: rows to append; columns missing from the schema
+                                are ignored, and missing columns are left empty
+        """
+
+        if self.schema is None:
+            self.schema = {name: _infer_kind(name, df[name]) for name in df}
+        self.append_encoded(encode(df, self.schema))
+
+    def append_encoded(self, columns):
+        """Append rows already converted by encode, e.g. in another process.
+
+        :param dict columns: the output of encode for the schema of the dataset
+        """
+
+        if not self._files:
+            self._start()
+
+        rows = 0
+        for name, kind in self.schema.items():
+            values = columns[name]
+            if kind == CATEGORY:
+                # Map the codes into the chunk's values onto the dictionary,
+                # growing it with new values
+                (codes, uniques) = values
+                dictionary = self.categories[name]
+                mapping = [dictionary.setdefault(value, len(dictionary))
+                           for value in uniques]
+                # Missing values have chunk code -1, which picks the trailing -1
+                mapping = np.array(mapping + [-1], dtype=DTYPES[kind])
+                values = mapping[codes]
+            values.tofile(self._files[name])
+            rows = len(values)
+
+        self.rows += rows
+
+    def _load(self, name):
+        """Load a column as a sort key."""
+
+        i = list(self.schema).index(name)
+        column = np.fromfile(self._column_file(i), dtype=DTYPES[self.schema[name]])
+        if self.schema[name] != DATE:
+            return column
+
+        # Dates as integers, which every numpy sort and comparison handles.
+        # NaT is the smallest integer, but has to sort last, as searchsorted on
+        # the dates expects
+        is_nat = np.isnat(column)
+        column = column.view('<i8')
+        column[is_nat] = np.iinfo(np.int64).max
+        return column
+
+    def _count_values(self):
+        """Count the values each row has, i.e. its columns that are not missing."""
+
+        counts = np.zeros(self.rows, dtype='<i4')
+        for i, kind in enumerate(self.schema.values()):
+            column = np.fromfile(self._column_file(i), dtype=DTYPES[kind])
+            if kind == NUMERIC:
+                counts += ~np.isnan(column)
+            elif kind == CATEGORY:
+                counts += column >= 0
+            else:
+                counts += ~np.isnat(column)
+        return counts
+
+    def _reorder(self, order):
+        """Rewrite every column file with its rows in order, one at a time."""
+
+        for i, kind in enumerate(self.schema.values()):
+            column_file = self._column_file(i)
+            column = np.fromfile(column_file, dtype=DTYPES[kind])
+            column[order].tofile(column_file)
+        self.rows = len(order)
+
+    def close(self, sort_by='DATE', unique=None):
+        """Finish the dataset and write its meta.json.
+
+        :param str sort_by: the column to sort rows by, if it is in the schema
+        :param list unique: columns identifying a row, e.g. ['DATE', 'PLAYER_NAME',
+                            'OWN_TEAM']; only one row of each is kept, the one
+                            with the most values, or else the first appended
+        """
+
+        for f in self._files.values():
+            f.close()
+
+        if self.schema is None:
+            self.schema = {}
+        if sort_by not in self.schema:
+            sort_by = None
+
+        order = np.arange(self.rows)
+        if unique and self.rows > 1:
+            keys = [self._load(name) for name in unique]
+            # The last key sorts first, and the sort is stable, so within each
+            # key the most complete row comes first, and then the first appended
+            order = np.lexsort([-self._count_values()] + keys[::-1])
+            is_new = np.zeros(self.rows - 1, dtype=bool)
+            for key in keys:
+                key = key[order]
+                is_new |= key[1:] != key[:-1]
+            order = order[np.concatenate([[True], is_new])]
+        if sort_by and self.rows > 1:
+            key = self._load(sort_by)[order]
+            order = order[np.argsort(key, kind='stable')]
+        if len(order) != self.rows or np.any(order != np.arange(self.rows)):
+            self._reorder(order)
+
+        meta = {
+            'rows': self.rows,
+            'sorted_by': sort_by,
+            'columns': [
+                {'name': name, 'kind': kind, 'file': f'col{i}.bin'}
+                for i, (name, kind) in enumerate(self.schema.items())
+            ],
+            # Values in code order
+            'categories': {name: list(dictionary)
+                           for name, dictionary in self.categories.items()},
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+
+def write_dataset(df, path, schema=None):
+    """
+    :param pd.DataFrame df: the player-game table
+    :param str path: directory of the dataset, replaced if it exists
+    :param dict schema: maps column names to 'numeric', 'category' or 'date'
+    """
+
+    writer = DatasetWriter(path, schema)
+    writer.append(df)
+    writer.close()
+
+
+class Dataset:
+    def __init__(self, path):
+        """
+        :param str path: directory of the dataset
+        """
+
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.rows = meta['rows']
+        self.sorted_by = meta['sorted_by']
+        self.kinds = {col['name']: col['kind'] for col in meta['columns']}
+        self.categories = meta['categories']
+
+        self._arrays = {}
+        for col in meta['columns']:
+            dtype = DTYPES[col['kind']]
+            if self.rows == 0:
+                # Empty files cannot be memory mapped
+                self._arrays[col['name']] = np.empty(0, dtype=dtype)
+            else:
+                self._arrays[col['name']] = np.memmap(
+                    os.path.join(path, col['file']), mode='r', dtype=dtype,
+                    shape=(self.rows,),
+                )
+
+    @property
+    def columns(self):
+        return list(self.kinds)
+
+    def __len__(self):
+        return self.rows
+
+    def _date_slice(self, start=None, end=None):
+        if start is None and end is None:
+            return slice(None)
+        if self.sorted_by != 'DATE':
+            raise ValueError('Date ranges need a dataset sorted by DATE')
+
+        dates = self._arrays['DATE']
+        lo = 0 if start is None else \
+                np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        # Rows without a date sort last and are never part of a range
+        hi = np.searchsorted(dates, np.datetime64('NaT', 'D'), side='left') \
+                if end is None else \
+                np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return slice(lo, hi)
+
+    def column(self, name, start=None, end=None):
+        """Get a column without copying it. String columns are given as codes
+        into dataset.categories[name], with -1 for missing values.
+
+        :param str name: e.g. 'PTS'
+        :param str start: first date, e.g. '2018-01-01'
+        :param str end: last date, included
+
+        :return np.ndarray: a read-only view on the memory-mapped column
+        """
+
+        return self._arrays[name][self._date_slice(start, end)]
+
+    def read(self, columns=None, start=None, end=None):
+        """Load some columns of the rows in a date range into a DataFrame.
+
+        :param list columns: e.g. ['DATE', 'PLAYER_NAME', 'PTS'], defaults to all
+        :param str start: first date, e.g. '2018-01-01'
+        :param str end: last date, included
+
+        :return pd.DataFrame:
+        """
+
+        rows = self._date_slice(start, end)
+
+        data = {}
+        for name in columns or self.columns:
+            values = self._arrays[name][rows]
+            if self.kinds[name] == CATEGORY:
+                values = pd.Categorical.from_codes(values, self.categories[name])
+            data[name] = values
+        return pd.DataFrame(data)
+
+
+def open_dataset(path):
+    """
+    :param str path: directory of the dataset
+
+    :return Dataset:
+    """
+
+    return Dataset(path)
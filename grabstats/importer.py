@@ -0,0 +1,242 @@
+"""
+Import existing CSV box score dumps into columnar datasets
+
+The CSV files written so far come in two dialects: uppercase columns ('MP',
+'FG%') from core.py and lowercase data-stat columns ('mp', 'fg_pct') from
+box_score.py. They may also repeat their header row in the middle, and the same
+player-game may show up more than once. Files are split into shards of whole
+lines that are parsed and encoded in a process pool, mapped onto the uppercase
+columns and appended to one dataset for basic and one for advanced box scores.
+Only a few shards per process are in flight at once, so memory stays bounded
+whatever the number and size of the files.
+"""
+
+import collections
+import csv
+import io
+import multiprocessing
+import os
+
+import pandas as pd
+
+from grabstats.dataset import CATEGORY, DATE, NUMERIC, DatasetWriter, encode
+
+
+BASIC_COLS = [
+    'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
+    'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', 'FT', 'FTA', 'FT%',
+    'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS',
+    '+/-', 'USG%', 'PACE',
+]
+
+ADV_COLS = [
+    'DATE', 'PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE', 'MP',
+    'TS%', 'eFG%', '3PAr', 'FTr', 'ORB%', 'DRB%', 'TRB%', 'AST%',
+    'STL%', 'BLK%', 'TOV%', 'USG%', 'ORtg', 'DRtg',
+]
+
+# Columns only found in advanced box scores
+ADV_ONLY_COLS = set(ADV_COLS) - set(BASIC_COLS)
+
+# Maps the data-stat columns of box_score.py onto the columns of core.py
+DATA_STAT_COLS = {
+    'player': 'PLAYER_NAME', 'mp': 'MP',
+    'fg': 'FG', 'fga': 'FGA', 'fg_pct': 'FG%',
+    'fg3': '3P', 'fg3a': '3PA', 'fg3_pct': '3P%',
+    'ft': 'FT', 'fta': 'FTA', 'ft_pct': 'FT%',
+    'orb': 'ORB', 'drb': 'DRB', 'trb': 'TRB',
+    'ast': 'AST', 'stl': 'STL', 'blk': 'BLK',
+    'tov': 'TOV', 'pf': 'PF', 'pts': 'PTS',
+    'plus_minus': '+/-',
+    'ts_pct': 'TS%', 'efg_pct': 'eFG%',
+    'fg3a_per_fga_pct': '3PAr', 'fta_per_fga_pct': 'FTr',
+    'orb_pct': 'ORB%', 'drb_pct': 'DRB%', 'trb_pct': 'TRB%',
+    'ast_pct': 'AST%', 'stl_pct': 'STL%', 'blk_pct': 'BLK%',
+    'tov_pct': 'TOV%', 'usg_pct': 'USG%',
+    'off_rtg': 'ORtg', 'def_rtg': 'DRtg',
+}
+
+HEADER_NAMES = set(BASIC_COLS) | set(ADV_COLS) | set(DATA_STAT_COLS)
+
+KEY_COLS = ['DATE', 'PLAYER_NAME', 'OWN_TEAM']
+
+SHARD_SIZE = 16 * 1024 * 1024  # bytes
+
+
+def _schema(cols):
+    schema = {}
+    for col in cols:
+        if col == 'DATE':
+            schema[col] = DATE
+        elif col in ['PLAYER_NAME', 'OWN_TEAM', 'OPP_TEAM', 'VENUE']:
+            schema[col] = CATEGORY
+        else:
+            schema[col] = NUMERIC
+    return schema
+
+
+SCHEMAS = {'basic': _schema(BASIC_COLS), 'adv': _schema(ADV_COLS)}
+
+
+def _get_kind(header):
+    """
+    :param list header: the columns of a CSV file, in either dialect
+
+    :return str: 'basic' or 'adv'
+    """
+
+    cols = {DATA_STAT_COLS.get(col, col) for col in header}
+    return 'adv' if cols & ADV_ONLY_COLS else 'basic'
+
+
+def _get_shards(path, shard_size=SHARD_SIZE):
+    """Split a file into byte ranges. Each line belongs to the shard its first
+    byte falls in.
+    """
+
+    size = os.path.getsize(path)
+    return [(path, start, min(start + shard_size, size))
+            for start in range(0, size, shard_size)]
+
+
+def _iter_lines(path, start, end):
+    """Yield the offset and bytes of every line of a shard."""
+
+    with open(path, 'rb') as f:
+        if start > 0:
+            # Skip the line started in the previous shard, if any
+            f.seek(start - 1)
+            f.readline()
+        offset = f.tell()
+        while offset < end:
+            line = f.readline()
+            if not line:
+                break
+            yield offset, line
+            offset += len(line)
+
+
+def _parse_header(line):
+    """
+    :param bytes line: a line of a CSV file
+
+    :return list: the columns if the line is a header row, else None
+    """
+
+    # Data rows start with a date or a player name, header rows with a column
+    # name. Other columns may be unknown, e.g. ones added by reextract, and are
+    # left out of the datasets
+    if line.split(b',', 1)[0].decode('utf-8', 'replace') not in HEADER_NAMES:
+        return None
+    return next(csv.reader([line.decode('utf-8').rstrip('\r\n')]))
+
+
+def _find_headers(shard):
+    """
+    :return list: the offset and columns of every header row in the shard
+    """
+
+    (path, start, end) = shard
+    headers = []
+    for offset, line in _iter_lines(path, start, end):
+        header = _parse_header(line)
+        if header:
+            headers.append((offset, header))
+    return headers
+
+
+def _read_shard(shard):
+    """Parse a shard, map it onto the uppercase columns and encode it.
+
+    Rows are parsed with the header row last seen before them, so files that
+    were appended to by both writers, and change columns halfway, are read
+    correctly.
+
+    :return list: the kind of box score and its encoded columns, for every run
+                  of rows under the same header
+    """
+
+    (path, start, end, header) = shard
+
+    runs = [(header, start, [])]
+    for offset, line in _iter_lines(path, start, end):
+        new_header = _parse_header(line)
+        if new_header:
+            runs.append((new_header, offset, []))
+        elif line.strip():
+            runs[-1][2].append(line)
+
+    box_scores = []
+    for header, offset, lines in runs:
+        if not lines:
+            continue
+        if header is None:
+            raise ValueError(f'{path}: no header row before byte {offset}')
+
+        box_score = pd.read_csv(io.BytesIO(b''.join(lines)), header=None,
+                                names=header, dtype=str)
+        box_score = box_score.rename(columns=DATA_STAT_COLS)
+        kind = _get_kind(header)
+        box_scores.append((kind, encode(box_score, SCHEMAS[kind])))
+    return box_scores
+
+
+def _imap_bounded(pool, func, tasks, window):
+    """Like pool.imap, but with at most window tasks submitted and not yet
+    consumed, so results do not pile up when the consumer is slower.
+    """
+
+    pending = collections.deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(func, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+def import_csv(paths, out_dir, processes=None, shard_size=SHARD_SIZE):
+    """Import CSV box scores into a 'basic' and an 'adv' dataset.
+
+    Files are read twice: once to find their header rows, and once to parse
+    the rows under them. Empty files are skipped.
+
+    :param list paths: CSV files, basic and advanced ones in any dialect
+    :param str out_dir: directory for the datasets
+    :param int processes: number of parser processes, defaults to the CPU count
+    :param int shard_size: bytes of CSV parsed at once by a process
+
+    :return dict: the number of rows kept in each dataset
+    """
+
+    shards = [shard for path in paths for shard in _get_shards(path, shard_size)]
+
+    processes = processes or os.cpu_count()
+    writers = {kind: DatasetWriter(os.path.join(out_dir, kind), schema)
+               for kind, schema in SCHEMAS.items()}
+
+    with multiprocessing.Pool(processes) as pool:
+        # Give every shard the header in effect where it starts
+        headers = {}
+        for (path, start, end), found in zip(shards, pool.imap(_find_headers, shards)):
+            headers.setdefault(path, []).extend(found)
+        tasks = []
+        for (path, start, end) in shards:
+            header = None
+            for offset, columns in headers[path]:
+                if offset >= start:
+                    break
+                header = columns
+            tasks.append((path, start, end, header))
+
+        # The shards are consumed in order, so which of two equally complete
+        # duplicate rows is kept does not depend on timing
+        for box_scores in _imap_bounded(pool, _read_shard, tasks, 2 * processes):
+            for kind, columns in box_scores:
+                writers[kind].append_encoded(columns)
+
+    rows = {}
+    for kind, writer in writers.items():
+        writer.close(sort_by='DATE', unique=KEY_COLS)
+        rows[kind] = writer.rows
+    return rows
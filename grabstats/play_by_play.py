@@ -0,0 +1,224 @@
+"""
+Stream play-by-play events from basketball-reference.com
+
+Play-by-play pages are many times larger than box score pages, so instead of
+building the whole tree with BeautifulSoup they are parsed incrementally: rows
+of the play-by-play table are turned into events as soon as they are closed,
+and then discarded, which keeps the memory used per page bounded.
+"""
+
+from collections import namedtuple
+import csv
+import os
+
+from lxml import etree
+import requests
+
+
+PlayByPlayEvent = namedtuple('PlayByPlayEvent', [
+    'date', 'period', 'clock', 'team', 'opp_team', 'player', 'player_id',
+    'event_type', 'road_pts', 'home_pts', 'description',
+])
+
+# Checked in order, so e.g. 'makes free throw' is a free throw, not a shot
+EVENT_TYPES = [
+    ('free throw', 'free throw'),
+    ('makes', 'made shot'),
+    ('misses', 'missed shot'),
+    ('rebound', 'rebound'),
+    ('turnover', 'turnover'),
+    ('foul', 'foul'),
+    ('enters the game', 'substitution'),
+    ('timeout', 'timeout'),
+    ('jump ball', 'jump ball'),
+    ('violation', 'violation'),
+    ('start of', 'period start'),
+    ('end of', 'period end'),
+]
+
+
+def pbp_url(box_score_url):
+    """Get the play-by-play counterpart of a box score URL.
+
+    :param str box_score_url: e.g.
+        'https://www.basketball-reference.com/boxscores/201905030BOS.html'
+
+    :return str: e.g.
+        'https://www.basketball-reference.com/boxscores/pbp/201905030BOS.html'
+    """
+    return box_score_url.replace('/boxscores/', '/boxscores/pbp/', 1)
+
+
+def format_clock(clock):
+    """Convert the game clock to seconds left in the period.
+
+    :param str clock: e.g. '11:48.0'
+
+    :return float: e.g. 708.0
+    """
+    (m, s) = clock.split(':')
+    return int(m) * 60 + float(s)
+
+
+def _event_type(description):
+    description = description.lower()
+    for keyword, event_type in EVENT_TYPES:
+        if keyword in description:
+            return event_type
+    return 'other'
+
+
+def _text(cell):
+    return ''.join(cell.itertext()).strip()
+
+
+def _player(cell):
+    """Get the name and id of the first player linked in a play cell."""
+    link = cell.find('a')
+    if link is None:
+        return '', ''
+    player_id = os.path.splitext(os.path.basename(link.get('href', '')))[0]
+    return link.text or '', player_id
+
+
+def _parse_score(score):
+    (road_pts, home_pts) = score.split('-')
+    return int(road_pts), int(home_pts)
+
+
+def _iter_rows(source):
+    """Yield the rows of the play-by-play table, clearing each one after use.
+
+    :param source: a file-like object with the play-by-play page
+    """
+
+    in_pbp = False
+    context = etree.iterparse(source, events=('start', 'end'),
+                              tag=('table', 'tr'), html=True)
+    for event, elem in context:
+        if elem.tag == 'table':
+            if event == 'start':
+                in_pbp = elem.get('id') == 'pbp'
+            else:
+                in_pbp = False
+            continue
+
+        if event == 'start':
+            continue
+
+        if in_pbp:
+            yield elem
+
+        # Free the row and everything parsed before it
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def play_by_play_parse(source, game_date, road_team_abbr, home_team_abbr):
+    """Parse a play-by-play page into events, one table row at a time.
+
+    :param source: a file-like object with the play-by-play page
+    :param str game_date: e.g. '2019-05-03'
+    :param str road_team_abbr: the capitalized abbreviated name, e.g. 'MIL'
+    :param str home_team_abbr: the capitalized abbreviated name, e.g. 'BOS'
+
+    :return generator: of PlayByPlayEvent
+    """
+
+    period = 0
+    road_pts, home_pts = 0, 0
+
+    for row in _iter_rows(source):
+        cells = row.findall('td')
+
+        # Period headers and column names only have th cells
+        if len(cells) == 2:
+            # Spans the whole row, e.g. 'Start of 1st quarter' or 'Jump ball'
+            play = cells[1]
+            team, opp_team = '', ''
+        elif len(cells) == 6:
+            (clock, road_play, _, score, _, home_play) = cells
+            road_pts, home_pts = _parse_score(score.text)
+            if _text(road_play):
+                play = road_play
+                team, opp_team = road_team_abbr, home_team_abbr
+            else:
+                play = home_play
+                team, opp_team = home_team_abbr, road_team_abbr
+        else:
+            continue
+
+        description = _text(play)
+        event_type = _event_type(description)
+        if event_type == 'period start':
+            period += 1
+        player, player_id = _player(play)
+
+        yield PlayByPlayEvent(
+            date=game_date,
+            period=period,
+            clock=format_clock(cells[0].text),
+            team=team,
+            opp_team=opp_team,
+            player=player,
+            player_id=player_id,
+            event_type=event_type,
+            road_pts=road_pts,
+            home_pts=home_pts,
+            description=description,
+        )
+
+
+def play_by_play_get_one(game_date, road_team_abbr, home_team_abbr, url):
+    """Get the play-by-play events for one game.
+
+    The page is streamed from the server into the parser, so it is never held
+    in memory as a whole.
+
+    :param str game_date: e.g. '2019-05-03'
+    :param str road_team_abbr: the capitalized abbreviated name, e.g. 'MIL'
+    :param str home_team_abbr: the capitalized abbreviated name, e.g. 'BOS'
+    :param str url: the URL to the box score page on basketball-reference.com
+
+    :return generator: of PlayByPlayEvent
+    """
+
+    with requests.get(pbp_url(url), stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield from play_by_play_parse(
+            response.raw, game_date, road_team_abbr, home_team_abbr
+        )
+
+
+def play_by_play_get_many(schedule):
+    """
+    :param pd.DataFrame schedule: contains game info for the schedule of games
+
+    :return generator: of PlayByPlayEvent for every game in the schedule
+    """
+
+    for idx, row in schedule.iterrows():
+        yield from play_by_play_get_one(
+            row['DATE'],
+            row['ROAD_TEAM_ABBR'],
+            row['HOME_TEAM_ABBR'],
+            row['BOX_SCORE_URL'],
+        )
+
+
+def to_csv(events, outfile):
+    """Write events to a CSV file as they are produced.
+
+    :param iterable events: of PlayByPlayEvent
+    :param str outfile: CSV file to append to
+    """
+
+    header = not os.path.isfile(outfile)
+
+    with open(outfile, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(PlayByPlayEvent._fields)
+        writer.writerows(events)
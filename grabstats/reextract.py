@@ -0,0 +1,113 @@
+"""
+Re-extract box scores from the page archive, without touching the network
+
+This is how new columns get added to history: every archived box score page
+is parsed again, in parallel, with the new column set. The games are found
+from the box score pages themselves, which have the date and both teams, so
+games whose schedule page was never archived, e.g. ones grabbed while their
+month was still going on, are included too.
+"""
+
+import multiprocessing
+import os
+import re
+
+from grabstats.archive import PageArchive
+from grabstats.box_score import box_scores_parse_game
+
+
+# e.g. '.../boxscores/201905030BOS.html', for a game on 2019-05-03 at BOS
+BOX_SCORE_URL = re.compile(r'/boxscores/(\d{4})(\d{2})(\d{2})\d([A-Z]{3})\.html$')
+
+# Each team has a basic box score table, e.g. 'box_mil_basic'
+TEAM_TABLE = re.compile(r'id="box_([a-z]{3})_basic"')
+
+# Set in each worker process by _init_worker
+_archive = None
+
+
+def get_archived_games(archive):
+    """
+    :param PageArchive archive:
+
+    :return list: the URLs of every archived box score page, in date order
+    """
+
+    urls = [url for url in archive.urls() if BOX_SCORE_URL.search(url)]
+    # The page names start with the date, e.g. '201905030BOS.html'
+    return sorted(urls, key=os.path.basename)
+
+
+def get_game(url, page):
+    """Get the date and teams of a game from its box score page.
+
+    :param str url: e.g. '.../boxscores/201905030BOS.html'
+    :param str page: the box score page
+
+    :return tuple: the date, road team and home team, e.g.
+                   ('2019-05-03', 'MIL', 'BOS')
+    """
+
+    (year, month, day, home_team_abbr) = BOX_SCORE_URL.search(url).groups()
+    teams = {team.upper() for team in TEAM_TABLE.findall(page)}
+    road_teams = teams - {home_team_abbr}
+    if len(road_teams) != 1:
+        raise ValueError(f'expected the box scores of 2 teams, found {sorted(teams)}')
+    return f'{year}-{month}-{day}', road_teams.pop(), home_team_abbr
+
+
+def _init_worker(archive_dir):
+    global _archive
+    _archive = PageArchive(archive_dir)
+
+
+def _reextract_game(task):
+    (url, basic_stats, adv_stats) = task
+    # One bad page must not stop the other games, so report it instead
+    try:
+        page = _archive.get(url)
+        (game_date, road_team_abbr, home_team_abbr) = get_game(url, page)
+        basic, adv = box_scores_parse_game(page, game_date, road_team_abbr,
+                                           home_team_abbr, basic_stats,
+                                           adv_stats)
+    except Exception as e:
+        return url, None, None, e
+    return url, basic, adv, None
+
+
+def reextract(archive_dir, basic_box_score_file, adv_box_score_file,
+              basic_stats=None, adv_stats=None, processes=None):
+    """Parse every archived game again and write a fresh dataset.
+
+    :param str archive_dir: directory of the page archive
+    :param str basic_box_score_file: CSV file to write basic box score
+    :param str adv_box_score_file: CSV file to write advanced box score
+    :param list basic_stats: the basic columns to get, instead of the default ones
+    :param list adv_stats: the advanced columns to get, instead of the default ones
+    :param int processes: number of parser processes, defaults to the CPU count
+
+    :return int: the number of games re-extracted
+    """
+
+    archive = PageArchive(archive_dir)
+    urls = get_archived_games(archive)
+    archive.close()
+
+    tasks = [(url, basic_stats, adv_stats) for url in urls]
+
+    n_games = 0
+    with multiprocessing.Pool(processes, _init_worker, (archive_dir,)) as pool, \
+            open(basic_box_score_file, 'w') as basic_f, \
+            open(adv_box_score_file, 'w') as adv_f:
+        # imap keeps the games in date order, while parsing ahead
+        for url, basic, adv, error in pool.imap(_reextract_game, tasks,
+                                                chunksize=8):
+            if error is not None:
+                print(f'Skipped {url}: {error}')
+                continue
+            header = n_games == 0
+            basic.to_csv(basic_f, header=header, index=False)
+            adv.to_csv(adv_f, header=header, index=False)
+            n_games += 1
+
+    return n_games
@@ -5,27 +5,33 @@ import arrow
 from bs4 import BeautifulSoup
 import numpy as np
 import pandas as pd
-import requests
 import yaml
 
+from grabstats.archive import get_page
+
 
 class MonthSchedule:
-    def __init__(self, year, month):
+    def __init__(self, year, month, archive=None):
         """
         :param str year:
         :param str month:
+        :param PageArchive archive: where to look up and store the page
         """
 
         date = '-'.join([year, month])
         month = arrow.get(date).datetime.strftime('%B').lower()  # e.g. 'january'
 
+        # Games are added to the page until the month is over, so only archive
+        # it from then on
+        is_finished = arrow.get(date).shift(months=1) <= arrow.utcnow()
+
         # BBallRef takes the season year as the calendar year when the Playoffs
         # are played; hence, the 2017-2018 season is the 2018 season
         if month in ['october', 'november', 'december']:
             year = str(int(year) + 1)  # Increment year
 
         url = f'https://www.basketball-reference.com/leagues/NBA_{year}_games-{month}.html'
-        page = requests.get(url).text  # TODO: Handle request error
+        page = get_page(url, archive, store=is_finished)
         self.soup = BeautifulSoup(page, 'lxml')
         self._get_schedule()
 
@@ -66,7 +72,8 @@ class MonthSchedule:
         """
 
         result = self.soup.find_all(tag, {'data-stat': data_stat})
-        if has_title:
+        # A page without a schedule table has no title row either
+        if has_title and result:
             result.pop(0)
         return [row.a.text if row.a else row.text for row in result]
 
@@ -108,25 +115,26 @@ class MonthSchedule:
 
 
 class DaySchedule(MonthSchedule):
-    def __init__(self, year, month, day):
-        super().__init__(year, month)
+    def __init__(self, year, month, day, archive=None):
+        super().__init__(year, month, archive)
         date = '-'.join([year, month, day])
         self.schedule = self.schedule.query('DATE == @date').reset_index(drop=True)
 
 
-def get_schedule(year, month, day=None):
+def get_schedule(year, month, day=None, archive=None):
     """
     :param str year:
     :param str month:
     :param str day:
+    :param PageArchive archive: where to look up and store the schedule page
 
     :return pd.DataFrame schedule: contains game info for games played on date,
                                    either a day or a month
     """
 
     if day:
-        schedule = DaySchedule(year, month, day)
+        schedule = DaySchedule(year, month, day, archive)
     else:
-        schedule = MonthSchedule(year, month)
+        schedule = MonthSchedule(year, month, archive)
 
     return schedule.schedule
\ No newline at end of file
@@ -21,7 +21,7 @@ requires = [
     'pyyaml',
 ]
 
-# test_requirements = []
+test_requirements = ['pytest']
 
 about = {}
 with open(os.path.join(here, 'grabstats', '__version__.py'), 'r', 'utf-8') as f:
@@ -57,7 +57,7 @@ setup(
         ],
     },
     # cmdclass={},
-    # tests_require=test_requirements,
+    tests_require=test_requirements,
     # extra_require={},
 )
 
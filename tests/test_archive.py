@@ -0,0 +1,86 @@
+import pytest
+import requests
+
+from grabstats import archive
+from grabstats.archive import PageArchive, get_page
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error', response=self)
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Serve pages from a dict, counting the requests."""
+
+    pages = {}
+    requested = []
+
+    def fake_get(url):
+        requested.append(url)
+        return pages[url]
+
+    monkeypatch.setattr(archive.requests, 'get', fake_get)
+    pages['requested'] = requested
+    return pages
+
+
+def test_round_trip(tmp_path):
+    pages = {f'https://example.com/{i}.html': f'<html>{i}</html>' * 100
+             for i in range(5)}
+    writer = PageArchive(str(tmp_path))
+    for url, page in pages.items():
+        writer.put(url, page)
+    writer.put('https://example.com/0.html', 'ignored, already archived')
+
+    reader = PageArchive(str(tmp_path))
+    assert reader.urls() == list(pages)
+    for url in reversed(list(pages)):
+        assert reader.get(url) == pages[url]
+    with pytest.raises(KeyError):
+        reader.get('https://example.com/missing.html')
+
+
+def test_sees_pages_added_by_another_archive(tmp_path):
+    reader = PageArchive(str(tmp_path))
+    PageArchive(str(tmp_path)).put('https://example.com/a.html', 'a')
+
+    assert 'https://example.com/a.html' in reader
+    assert reader.get('https://example.com/a.html') == 'a'
+
+
+def test_get_page_reads_archive_first(tmp_path, pages):
+    url = 'https://example.com/a.html'
+    pages[url] = FakeResponse('a')
+    pages_archive = PageArchive(str(tmp_path))
+
+    assert get_page(url, pages_archive) == 'a'
+    assert get_page(url, pages_archive) == 'a'
+    assert pages['requested'] == [url]
+
+
+def test_get_page_does_not_archive_errors(tmp_path, pages):
+    url = 'https://example.com/a.html'
+    pages[url] = FakeResponse('Too Many Requests', 429)
+    pages_archive = PageArchive(str(tmp_path))
+
+    with pytest.raises(requests.HTTPError):
+        get_page(url, pages_archive)
+    assert url not in pages_archive
+
+
+def test_get_page_without_store_always_fetches(tmp_path, pages):
+    url = 'https://example.com/a.html'
+    pages[url] = FakeResponse('a')
+    pages_archive = PageArchive(str(tmp_path))
+
+    get_page(url, pages_archive, store=False)
+    get_page(url, pages_archive, store=False)
+    assert url not in pages_archive
+    assert pages['requested'] == [url, url]
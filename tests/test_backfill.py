@@ -0,0 +1,137 @@
+import time
+
+import arrow
+import pandas as pd
+import pytest
+import requests
+
+from grabstats import backfill, schedule
+from grabstats.backfill import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+
+SCHEDULE_PAGE = """
+<table id="schedule">
+<thead><tr>
+  <th data-stat="date_game">Date</th>
+  <th data-stat="visitor_team_name">Visitor</th>
+  <th data-stat="visitor_pts">PTS</th>
+  <th data-stat="home_team_name">Home</th>
+  <th data-stat="home_pts">PTS</th>
+  <th data-stat="box_score_text"></th>
+</tr></thead>
+<tbody><tr>
+  <th data-stat="date_game"><a>{date}</a></th>
+  <td data-stat="visitor_team_name"><a>Boston Celtics</a></td>
+  <td data-stat="visitor_pts">99</td>
+  <td data-stat="home_team_name"><a>Cleveland Cavaliers</a></td>
+  <td data-stat="home_pts">102</td>
+  <td data-stat="box_score_text"><a href="/boxscores/{game_id}.html">Box Score</a></td>
+</tr></tbody>
+</table>
+"""
+
+OFF_SEASON = ['july', 'august', 'september']
+
+
+def make_schedule(n_games):
+    return pd.DataFrame({
+        'DATE': ['2018-01-01'] * n_games,
+        'ROAD_TEAM_ABBR': ['BOS'] * n_games,
+        'HOME_TEAM_ABBR': ['CLE'] * n_games,
+        'BOX_SCORE_URL': [f'https://example.com/boxscores/{i}.html'
+                          for i in range(n_games)],
+    })
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.db'), lease_time=0.1,
+                      max_attempts=2, backoff=0.1)
+    queue.put(make_schedule(1))
+    yield queue
+    queue.close()
+
+
+def test_put_is_idempotent(queue):
+    assert queue.put(make_schedule(2)) == 1
+    assert queue.counts()[PENDING] == 2
+
+
+def test_claimed_task_is_not_handed_out_twice(queue):
+    assert queue.claim('a') is not None
+    assert queue.claim('b') is None
+    assert queue.counts()[LEASED] == 1
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    task = queue.claim('a')
+    time.sleep(0.15)
+    assert queue.claim('b')['id'] == task['id']
+    # The first worker lost its lease, so it cannot complete the task
+    assert not queue.complete(task['id'], 'a')
+    assert queue.complete(task['id'], 'b')
+    assert queue.counts()[DONE] == 1
+
+
+def test_failed_task_waits_before_retry(queue):
+    task = queue.claim('a')
+    queue.fail(task['id'], 'a', '429 Too Many Requests')
+    assert queue.claim('a') is None
+    time.sleep(0.25)  # backoff * 2 ** 1
+    assert queue.claim('a')['id'] == task['id']
+
+
+def test_gives_up_after_max_attempts(queue):
+    task = queue.claim('a')
+    queue.fail(task['id'], 'a', 'error')
+    time.sleep(0.25)
+    task = queue.claim('a')
+    queue.fail(task['id'], 'a', 'error')
+    assert queue.counts()[FAILED] == 1
+    assert queue.claim('a') is None
+
+
+def test_expired_lease_gives_up_after_max_attempts(queue):
+    queue.claim('a')
+    time.sleep(0.15)
+    queue.claim('b')
+    time.sleep(0.15)
+    assert queue.claim('c') is None
+    assert queue.counts()[FAILED] == 1
+
+
+def fake_get_page(url, archive=None, store=True):
+    # e.g. '.../NBA_2018_games-october.html', the 2017-2018 season
+    (season, month) = url.rsplit('/', 1)[1][len('NBA_'):-len('.html')].split('_games-')
+    if month in OFF_SEASON:
+        response = requests.Response()
+        response.status_code = 404
+        raise requests.HTTPError('404 Not Found', response=response)
+
+    date = arrow.get(f'{season} {month}', 'YYYY MMMM')
+    if month in ['october', 'november', 'december']:
+        date = date.shift(years=-1)
+    date = date.replace(day=15)
+    return SCHEDULE_PAGE.format(date=date.format('ddd, MMM D, YYYY'),
+                                game_id=date.format('YYYYMMDD') + '0CLE')
+
+
+def test_schedule_range_skips_off_season(monkeypatch):
+    monkeypatch.setattr(schedule, 'get_page', fake_get_page)
+
+    games = backfill.get_schedule_range(arrow.get('2018-04-01'),
+                                        arrow.get('2018-11-10'))
+
+    assert list(games['DATE']) == [
+        '2018-04-15', '2018-05-15', '2018-06-15', '2018-10-15',
+    ]
+    assert games['BOX_SCORE_URL'][0].endswith('/boxscores/201804150CLE.html')
+
+
+def test_schedule_range_only_off_season(monkeypatch):
+    monkeypatch.setattr(schedule, 'get_page', fake_get_page)
+
+    games = backfill.get_schedule_range(arrow.get('2018-07-01'),
+                                        arrow.get('2018-09-30'))
+
+    assert games.empty
@@ -0,0 +1,41 @@
+from click.testing import CliRunner
+import pandas as pd
+import pytest
+
+from grabstats import cli
+
+
+@pytest.fixture
+def grabbed(monkeypatch):
+    """Run grab without the network, recording what it grabs."""
+
+    grabbed = []
+
+    def fake_get_schedule(year, month, day=None, archive=None):
+        grabbed.append((year, month, day))
+        return pd.DataFrame()
+
+    monkeypatch.setattr(cli, 'get_schedule', fake_get_schedule)
+    monkeypatch.setattr(cli, 'box_scores_get_many',
+                        lambda schedule, archive=None: ([], []))
+    return grabbed
+
+
+@pytest.mark.parametrize('args', [
+    ['2018-11-15'],
+    ['grab', '2018-11-15'],
+    ['-b', 'basic.csv', '2018-11-15'],
+])
+def test_grab_is_the_default_command(grabbed, args):
+    result = CliRunner().invoke(cli.main, args)
+
+    assert result.exit_code == 0, result.output
+    assert len(grabbed) == 1
+
+
+def test_help_lists_commands():
+    result = CliRunner().invoke(cli.main, ['--help'])
+
+    assert result.exit_code == 0
+    assert 'enqueue' in result.output
+    assert 'reextract' in result.output
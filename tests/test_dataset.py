@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from grabstats.dataset import DatasetWriter, open_dataset, write_dataset
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    df = pd.DataFrame({
+        'DATE': ['2018-01-03', None, '2018-01-01', '2018-01-02'],
+        'PLAYER_NAME': ['Kyrie Irving', 'Al Horford', None, 'Kyrie Irving'],
+        'PTS': [22, 11, 25, None],
+    })
+    write_dataset(df, str(tmp_path))
+    return open_dataset(str(tmp_path))
+
+
+def test_rows_are_sorted_by_date(dataset):
+    df = dataset.read()
+    assert list(df['DATE'].dt.strftime('%Y-%m-%d').fillna('NaT')) == [
+        '2018-01-01', '2018-01-02', '2018-01-03', 'NaT',
+    ]
+
+
+def test_category_round_trip(dataset):
+    df = dataset.read()
+    assert list(df['PLAYER_NAME'].astype(object).fillna('')) == [
+        '', 'Kyrie Irving', 'Kyrie Irving', 'Al Horford',
+    ]
+    assert list(dataset.column('PLAYER_NAME')) == [-1, 0, 0, 1]
+    assert dataset.categories['PLAYER_NAME'] == ['Kyrie Irving', 'Al Horford']
+
+
+def test_date_slice(dataset):
+    df = dataset.read(['PTS'], start='2018-01-01', end='2018-01-02')
+    assert list(df.columns) == ['PTS']
+    assert len(df) == 2
+
+    # Rows without a date are never part of a date range
+    assert len(dataset.read(start='2018-01-02')) == 2
+    assert len(dataset.read(end='2018-01-01')) == 1
+    assert len(dataset.read(start='2019-01-01')) == 0
+
+
+def test_columns_are_memory_mapped(dataset):
+    pts = dataset.column('PTS')
+    assert isinstance(pts, np.memmap)
+    assert not pts.flags.writeable
+
+
+def test_unique_keeps_most_complete_row(tmp_path):
+    writer = DatasetWriter(str(tmp_path))
+    writer.append(pd.DataFrame({'DATE': ['2018-01-01'], 'PLAYER_NAME': ['A'],
+                                'PTS': [None], 'AST': [None]}))
+    writer.append(pd.DataFrame({'DATE': ['2018-01-01'] * 2,
+                                'PLAYER_NAME': ['A', 'A'],
+                                'PTS': [10, 12], 'AST': [1, 2]}))
+    writer.close(unique=['DATE', 'PLAYER_NAME'])
+
+    df = open_dataset(str(tmp_path)).read()
+    assert len(df) == 1
+    assert df['PTS'][0] == 10
+
+
+def test_empty_dataset(tmp_path):
+    write_dataset(pd.DataFrame({'DATE': [], 'PTS': []}), str(tmp_path))
+    dataset = open_dataset(str(tmp_path))
+    assert len(dataset) == 0
+    assert dataset.read(start='2018-01-01').empty
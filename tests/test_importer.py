@@ -0,0 +1,99 @@
+import numpy as np
+
+from grabstats.dataset import open_dataset
+from grabstats.importer import import_csv
+
+
+UPPER_HEADER = ('DATE,PLAYER_NAME,OWN_TEAM,OPP_TEAM,VENUE,MP,FG,FGA,FG%,3P,3PA,'
+                '3P%,FT,FTA,FT%,ORB,DRB,TRB,AST,STL,BLK,TOV,PF,PTS,+/-,USG%,PACE\n')
+UPPER_ROWS = [
+    '2017-10-17,Jaylen Brown,BOS,CLE,R,39.6,11,23,.478,2,9,.222,1,2,.500,'
+    '1,5,6,0,2,0,3,5,25,-5,29.9,99.3\n',
+    '2017-10-17,Kyrie Irving,BOS,CLE,R,39.35,8,17,.471,4,9,.444,2,2,1.000,'
+    '2,2,4,10,3,0,2,4,22,-1,22.2,99.3\n',
+]
+
+LOWER_HEADER = ('player,mp,fg,fga,fg_pct,pts,plus_minus,usg_pct,'
+                'DATE,OWN_TEAM,OPP_TEAM,VENUE\n')
+LOWER_ROWS = [
+    'Jaylen Brown,39.6,11,23,.478,25,-5,29.9,2017-10-17,BOS,CLE,R\n',
+    'Al Horford,32.1,4,9,.444,11,+3,18.0,2017-10-17,BOS,CLE,R\n',
+]
+
+
+def import_one(tmp_path, content, shard_size=64):
+    path = tmp_path / 'basic_box_score.csv'
+    path.write_text(content)
+    rows = import_csv([str(path)], str(tmp_path / 'out'), processes=2,
+                      shard_size=shard_size)
+    return rows, open_dataset(str(tmp_path / 'out' / 'basic'))
+
+
+def test_drops_repeated_headers(tmp_path):
+    content = UPPER_HEADER + UPPER_ROWS[0] + UPPER_HEADER + UPPER_ROWS[1]
+    rows, dataset = import_one(tmp_path, content)
+
+    assert rows == {'basic': 2, 'adv': 0}
+    df = dataset.read()
+    assert sorted(df['PLAYER_NAME']) == ['Jaylen Brown', 'Kyrie Irving']
+    assert sorted(df['PTS']) == [22, 25]
+
+
+def test_rekeys_rows_when_header_changes(tmp_path):
+    # Both writers appended to the same file, with small shards so the
+    # lowercase rows start in a shard that does not contain their header
+    content = UPPER_HEADER + UPPER_ROWS[1] + LOWER_HEADER + LOWER_ROWS[1]
+    rows, dataset = import_one(tmp_path, content, shard_size=16)
+
+    df = dataset.read().set_index('PLAYER_NAME')
+    assert rows['basic'] == 2
+    assert df.loc['Al Horford', 'PTS'] == 11
+    assert df.loc['Al Horford', '+/-'] == 3
+    assert df.loc['Kyrie Irving', 'AST'] == 10
+
+
+def test_keeps_most_complete_duplicate(tmp_path):
+    # The lowercase row comes first but has no 3P, AST, PACE, ...
+    content = (LOWER_HEADER + LOWER_ROWS[0] +
+               UPPER_HEADER + UPPER_ROWS[0] + UPPER_ROWS[0])
+    rows, dataset = import_one(tmp_path, content)
+
+    df = dataset.read()
+    assert rows['basic'] == 1
+    assert df['PACE'][0] == 99.3
+    assert df['AST'][0] == 0
+
+
+def test_ignores_unknown_columns(tmp_path):
+    # e.g. a column added to the box scores by reextract
+    content = ('player,mp,bpm,pts,DATE,OWN_TEAM,OPP_TEAM,VENUE\n'
+               'Jaylen Brown,39.6,4.2,25,2017-10-17,BOS,CLE,R\n')
+    rows, dataset = import_one(tmp_path, content)
+
+    df = dataset.read()
+    assert rows['basic'] == 1
+    assert 'bpm' not in dataset.columns
+    assert df['PTS'][0] == 25
+    assert df['PLAYER_NAME'][0] == 'Jaylen Brown'
+
+
+def test_skips_empty_files(tmp_path):
+    empty = tmp_path / 'empty.csv'
+    empty.write_text('')
+    path = tmp_path / 'basic_box_score.csv'
+    path.write_text(UPPER_HEADER + UPPER_ROWS[0])
+
+    rows = import_csv([str(empty), str(path)], str(tmp_path / 'out'),
+                      processes=1)
+
+    assert rows == {'basic': 1, 'adv': 0}
+
+
+def test_imports_sample_season(tmp_path):
+    paths = [f'data/2017-2018/{name}_box_score.csv' for name in ['basic', 'adv']]
+    rows = import_csv(paths, str(tmp_path), shard_size=256 * 1024)
+
+    basic = open_dataset(str(tmp_path / 'basic'))
+    assert rows['basic'] == len(basic) > 0
+    dates = basic.column('DATE')
+    assert np.all(dates[:-1] <= dates[1:])
@@ -0,0 +1,94 @@
+import io
+
+import pytest
+
+from grabstats.play_by_play import format_clock, play_by_play_parse, pbp_url
+
+
+PBP_PAGE = b"""<html><body>
+<table id="line_score">
+<tr><td>12:00.0</td><td colspan="5">Start of 1st quarter</td></tr>
+</table>
+<table id="pbp">
+<tr class="thead" id="q1"><th colspan="6">1st Quarter</th></tr>
+<tr class="thead"><th>Time</th><th>MIL</th><th></th><th>Score</th><th></th>
+    <th>BOS</th></tr>
+<tr><td>12:00.0</td><td colspan="5">Start of 1st quarter</td></tr>
+<tr><td>11:48.0</td><td>&nbsp;</td><td>&nbsp;</td><td>0-2</td><td>+2</td>
+    <td><a href="/players/h/horfoal01.html">A. Horford</a> makes 2-pt jump shot from 16 ft</td></tr>
+<tr><td>11:30.0</td>
+    <td><a href="/players/a/antetgi01.html">G. Antetokounmpo</a> makes free throw 1 of 2</td>
+    <td>+1</td><td>1-2</td><td>&nbsp;</td><td>&nbsp;</td></tr>
+<tr><td>11:30.0</td><td>&nbsp;</td><td>&nbsp;</td><td>1-2</td><td>&nbsp;</td>
+    <td>Turnover by <a href="/players/i/irvinky01.html">K. Irving</a> (offensive foul)</td></tr>
+<tr><td>0:00.0</td><td colspan="5">End of 1st quarter</td></tr>
+<tr class="thead" id="q2"><th colspan="6">2nd Quarter</th></tr>
+<tr><td>12:00.0</td><td colspan="5">Start of 2nd quarter</td></tr>
+<tr><td>11:52.5</td><td>&nbsp;</td><td>&nbsp;</td><td>1-2</td><td>&nbsp;</td>
+    <td><a href="/players/t/tatumja01.html">J. Tatum</a> misses 3-pt jump shot from 25 ft</td></tr>
+</table>
+</body></html>
+"""
+
+
+@pytest.fixture
+def events():
+    page = io.BytesIO(PBP_PAGE)
+    return list(play_by_play_parse(page, '2019-05-03', 'MIL', 'BOS'))
+
+
+def test_only_reads_pbp_table(events):
+    # The 'Start of 1st quarter' row of the other table is not an event
+    assert [e.description for e in events][:2] == [
+        'Start of 1st quarter',
+        'A. Horford makes 2-pt jump shot from 16 ft',
+    ]
+    assert len(events) == 7
+
+
+def test_counts_periods(events):
+    assert [e.period for e in events] == [1, 1, 1, 1, 1, 2, 2]
+
+
+def test_teams(events):
+    assert [(e.team, e.opp_team) for e in events] == [
+        ('', ''),
+        ('BOS', 'MIL'),  # the road cell only has &nbsp;
+        ('MIL', 'BOS'),
+        ('BOS', 'MIL'),
+        ('', ''),
+        ('', ''),
+        ('BOS', 'MIL'),
+    ]
+    assert events[2].player == 'G. Antetokounmpo'
+    assert events[2].player_id == 'antetgi01'
+
+
+def test_score_is_carried_through_period_rows(events):
+    assert [(e.road_pts, e.home_pts) for e in events] == [
+        (0, 0), (0, 2), (1, 2), (1, 2), (1, 2), (1, 2), (1, 2),
+    ]
+
+
+def test_event_types(events):
+    assert [e.event_type for e in events] == [
+        'period start',
+        'made shot',
+        'free throw',  # not a made shot
+        'turnover',  # not a foul
+        'period end',
+        'period start',
+        'missed shot',
+    ]
+
+
+def test_clock(events):
+    assert [e.clock for e in events][:2] == [720.0, 708.0]
+    assert events[-1].clock == 712.5
+    assert format_clock('0:00.0') == 0.0
+
+
+def test_pbp_url():
+    url = 'https://www.basketball-reference.com/boxscores/201905030BOS.html'
+    assert pbp_url(url) == \
+        'https://www.basketball-reference.com/boxscores/pbp/201905030BOS.html'
@@ -0,0 +1,116 @@
+import arrow
+from click.testing import CliRunner
+import pandas as pd
+import pytest
+
+from grabstats import archive
+from grabstats.archive import PageArchive
+from grabstats.box_score import ADV_DATA_STATS, BASIC_DATA_STATS, box_scores_get_many
+from grabstats.cli import main
+from grabstats.reextract import get_game, reextract
+from grabstats.schedule import get_schedule
+
+
+SCHEDULE_PAGE = """
+<table id="schedule">
+<thead><tr>
+  <th data-stat="date_game">Date</th>
+  <th data-stat="visitor_team_name">Visitor</th>
+  <th data-stat="visitor_pts">PTS</th>
+  <th data-stat="home_team_name">Home</th>
+  <th data-stat="home_pts">PTS</th>
+  <th data-stat="box_score_text"></th>
+</tr></thead>
+<tbody><tr>
+  <th data-stat="date_game"><a>{date}</a></th>
+  <td data-stat="visitor_team_name"><a>Boston Celtics</a></td>
+  <td data-stat="visitor_pts">99</td>
+  <td data-stat="home_team_name"><a>Cleveland Cavaliers</a></td>
+  <td data-stat="home_pts">102</td>
+  <td data-stat="box_score_text"><a href="{box_score}">Box Score</a></td>
+</tr></tbody>
+</table>
+"""
+
+
+def box_score_table(team, box_score_type, data_stats):
+    head = ''.join(f'<th data-stat="{stat}">{stat}</th>' for stat in data_stats)
+    cells = ''.join(
+        f'<td data-stat="{stat}">{"30:00" if stat == "mp" else "1"}</td>'
+        for stat in data_stats[1:]
+    )
+    return (f'<table id="box_{team}_{box_score_type}">'
+            f'<thead><tr>{head}</tr></thead>'
+            f'<tbody><tr><th data-stat="player"><a>{team} player</a></th>{cells}</tr>'
+            f'</tbody></table>')
+
+
+def box_score_page(teams):
+    return ''.join(box_score_table(team, 'basic', BASIC_DATA_STATS) +
+                   box_score_table(team, 'advanced', ADV_DATA_STATS)
+                   for team in teams)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def today_game(monkeypatch):
+    """A game played today, so its month is not over yet."""
+
+    today = arrow.utcnow()
+    box_score = f'/boxscores/{today.format("YYYYMMDD")}0CLE.html'
+    schedule_page = SCHEDULE_PAGE.format(date=today.format('ddd, MMM D, YYYY'),
+                                         box_score=box_score)
+
+    def fake_get(url):
+        if '/leagues/' in url:
+            return FakeResponse(schedule_page)
+        return FakeResponse(box_score_page(['bos', 'cle']))
+
+    monkeypatch.setattr(archive.requests, 'get', fake_get)
+    return today
+
+
+def test_reextracts_games_of_unfinished_month(tmp_path, today_game):
+    pages = PageArchive(str(tmp_path / 'archive'))
+    schedule = get_schedule(today_game.format('YYYY'), today_game.format('MM'),
+                            archive=pages)
+    box_scores_get_many(schedule, pages)
+
+    # Only the box score page is archived, the schedule page may still change
+    assert len(pages) == 1
+
+    basic_file = tmp_path / 'basic.csv'
+    n_games = reextract(str(tmp_path / 'archive'), str(basic_file),
+                        str(tmp_path / 'adv.csv'),
+                        basic_stats=['player', 'mp', 'fg3'], processes=1)
+
+    assert n_games == 1
+    basic = pd.read_csv(basic_file)
+    assert list(basic['player']) == ['bos player', 'cle player']
+    assert list(basic['OWN_TEAM']) == ['BOS', 'CLE']
+    assert list(basic['DATE']) == [today_game.format('YYYY-MM-DD')] * 2
+    assert list(basic['fg3']) == [1, 1]
+
+
+def test_get_game():
+    url = 'https://www.basketball-reference.com/boxscores/201905030BOS.html'
+    page = box_score_page(['mil', 'bos'])
+
+    assert get_game(url, page) == ('2019-05-03', 'MIL', 'BOS')
+
+
+def test_unknown_stats_fail_before_the_run(tmp_path):
+    result = CliRunner().invoke(main, [
+        'reextract', '--archive', str(tmp_path),
+        '--basic-stats', 'player,mp,fg3,fg3x',
+    ])
+
+    assert result.exit_code == 2
+    assert 'unknown stats: fg3x' in result.output